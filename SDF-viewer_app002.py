@@ -2,24 +2,117 @@
 
 Only a single slider is used for paging through the data. Molecule drawings are
 cached using an LRU cache so that only a limited number of SVGs are stored in
-memory at any time.
+memory at any time, backed by an on-disk cache that survives restarts.
 """
 
+import ast
+import contextlib
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from io import BytesIO
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
 
+import diskcache
+import numpy as np
 import pandas as pd
 import streamlit as st
+import xxhash
 from rdkit import Chem
-from rdkit.Chem import PandasTools
 from rdkit.Chem.Draw import rdMolDraw2D
-from st_aggrid import AgGrid, GridOptionsBuilder
+from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 from st_aggrid.shared import JsCode
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 
+# Rendered SVGs persist here so restarts and other sessions skip RDKit drawing.
+SVG_CACHE_DIR = ".svg_cache"
+# Most recently used page structures kept in memory per cached file.
+STRUCTURE_STORE_SIZE = 2000
+# Parsed uploads are kept here as Parquet, which reloads far faster than SDF.
+# Per user, and per app since each one post-processes the parsed frame
+# differently. Least recently used files go once the total passes the limit.
+PARSE_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "sdf-viewer",
+    "app002",
+)
+PARSE_CACHE_MAX_BYTES = 1 << 30
+# Bump whenever parsing or post-processing changes, so stale files are ignored.
+PARSE_CACHE_VERSION = 2
+# Identifiers that look numeric but must keep their text, e.g. "00003".
+_TEXT_COLUMNS = {"SMILES", "ID", "_Name"}
+# Number-like text pd.to_numeric may alter: leading zeros, and whole numbers
+# (exact in a float column only up to 2**53).
+_LEADING_ZERO = r"^[+-]?0\d"
+_INTEGER_TEXT = r"^[+-]?\d+$"
+# Whitespace between SVG tags carries nothing but payload bytes.
+_SVG_TAG_GAP = re.compile(r">\s+<")
+# Syntax allowed in filter queries: comparisons, boolean logic and arithmetic.
+_QUERY_NODES = (
+    ast.Expression, ast.Load, ast.Name, ast.Constant, ast.List, ast.Tuple,
+    ast.Compare, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Call,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.And, ast.Or, ast.Not, ast.Invert, ast.BitAnd, ast.BitOr,
+    ast.UAdd, ast.USub, ast.Add, ast.Sub, ast.Mult, ast.Div,
+    ast.FloorDiv, ast.Mod, ast.Pow,
+)
+# Math functions pandas.eval can call in a query, e.g. abs(MW) > 5.
+_QUERY_FUNCS = frozenset({
+    "abs", "sqrt", "exp", "expm1", "log", "log10", "log1p", "floor", "ceil",
+    "sin", "cos", "tan", "sinh", "cosh", "tanh",
+    "arcsin", "arccos", "arctan", "arctan2", "arcsinh", "arccosh", "arctanh",
+})
+
+# Grid styles for header text wrapping and right alignment. AgGrid renders in
+# a component iframe, so these go in through AgGrid(custom_css=...); page-level
+# CSS never reaches the grid.
+AGGRID_CSS = {
+    ".ag-header-cell-text": {
+        "white-space": "normal !important",
+        "text-align": "right !important",
+        "justify-content": "flex-end !important",
+        "line-height": "1.2 !important",
+        "font-size": "14px !important",
+        "word-wrap": "break-word !important",
+        "overflow-wrap": "break-word !important",
+    },
+    ".ag-header-cell": {"padding": "4px !important"},
+    ".custom-header": {
+        "white-space": "normal !important",
+        "text-align": "right !important",
+        "justify-content": "flex-end !important",
+        "line-height": "1.2 !important",
+        "font-size": "14px",
+        "padding": "4px",
+        "word-wrap": "break-word !important",
+    },
+    # Right align all cell content, whatever the column type
+    ".ag-cell": {
+        "text-align": "right !important",
+        "justify-content": "flex-end !important",
+    },
+    ".ag-cell-value": {"text-align": "right !important"},
+    ".ag-cell-numeric": {"text-align": "right !important"},
+    ".ag-cell-wrapper": {"justify-content": "flex-end !important"},
+    ".ag-cell-text": {"text-align": "right !important"},
+    # Keep structure images centered
+    '.ag-cell[col-id="Structure"]': {
+        "text-align": "center !important",
+        "justify-content": "center !important",
+    },
+}
+
 
 def set_custom_aggrid_css() -> None:
-    """Inject custom CSS for AgGrid header text wrapping, right alignment, and shrink sidebar width."""
+    """
+    Shrink the sidebar. The grid's own styles go in through AGGRID_CSS, since
+    page CSS does not reach the AgGrid iframe.
+    """
     st.markdown(
         """
     <style>
@@ -29,55 +122,212 @@ def set_custom_aggrid_css() -> None:
         max-width: 280px !important;
         width: 220px !important;
     }
-    /* Target AgGrid header cells specifically */
-    .ag-header-cell-text {
-        white-space: normal !important;
-        text-align: right !important;
-        justify-content: flex-end !important;
-        line-height: 1.2 !important;
-        font-size: 14px !important;
-        word-wrap: break-word !important;
-        overflow-wrap: break-word !important;
-    }
-    .ag-header-cell {
-        padding: 4px !important;
-    }
-    .custom-header {
-        white-space: normal !important;
-        text-align: right !important;
-        justify-content: flex-end !important;
-        line-height: 1.2 !important;
-        font-size: 14px;
-        padding: 4px;
-        word-wrap: break-word !important;
-    }
-    .ag-cell { text-align: right !important; justify-content: flex-end !important; }
-    .ag-cell-value { text-align: right !important; }
-    .ag-cell-numeric { text-align: right !important; }
-    .ag-cell-wrapper { justify-content: flex-end !important; }
-    .ag-cell-text { text-align: right !important; }
     </style>
     """,
         unsafe_allow_html=True,
     )
 
 
+@st.cache_resource
+def _svg_disk_cache() -> diskcache.Cache:
+    """On-disk SVG store keyed by canonical SMILES."""
+    return diskcache.Cache(SVG_CACHE_DIR)
+
+
+def _draw_svg(smiles: str, disk_cache: diskcache.Cache) -> str:
+    """
+    Return an SVG string for the given SMILES structure.
+    Equivalent SMILES share one disk cache entry via their canonical form.
+    The cache directory is shared with app001, so entries use the same form:
+    the XML prolog and inter-tag whitespace stripped.
+    """
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return ""
+    key = Chem.MolToSmiles(mol)
+    svg = disk_cache.get(key)
+    if svg is None:
+        # noFreetype: a drawer is single-use, so skip loading fonts for each one
+        drawer = rdMolDraw2D.MolDraw2DSVG(120, 100, -1, -1, True)
+        drawer.DrawMolecule(mol)
+        drawer.FinishDrawing()
+        svg = drawer.GetDrawingText().replace("\n", "")
+        svg = _SVG_TAG_GAP.sub("><", svg[svg.find("<svg"):])
+        disk_cache.set(key, svg)
+    return svg
+
+
 @lru_cache(maxsize=500)
 def _cached_svg(smiles: str) -> str:
     """Return an SVG string for the given SMILES structure."""
-    mol = Chem.MolFromSmiles(smiles)
-    if mol is None:
+    return _draw_svg(smiles, _svg_disk_cache())
+
+
+def _wrap_svg(svg: str) -> str:
+    """
+    Embed an SVG as an <img> data URI so AgGrid renders it as one image.
+    Only the characters that break a data URI are escaped.
+    """
+    if not svg:
         return ""
-    drawer = rdMolDraw2D.MolDraw2DSVG(120, 100)
-    drawer.DrawMolecule(mol)
-    drawer.FinishDrawing()
-    return drawer.GetDrawingText().replace("\n", "")
+    uri = svg.replace("%", "%25").replace("#", "%23").replace('"', "%22")
+    return f'<img src="data:image/svg+xml,{uri}">'
 
 
 def mol_to_svg_str(smiles: str) -> str:
-    """Wrap the cached SVG in a div so AgGrid can render it."""
-    svg = _cached_svg(smiles)
-    return f"<div>{svg}</div>" if svg else ""
+    """Wrap the cached SVG in an <img> tag so AgGrid can render it."""
+    return _wrap_svg(_cached_svg(smiles))
+
+
+class _SvgStore:
+    """
+    SMILES-to-SVG map that keeps the maxsize most recently used entries.
+    Shared by reruns, sessions and worker threads, so access is locked.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._svgs: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._svgs)
+
+    def __contains__(self, smiles: str) -> bool:
+        return smiles in self._svgs
+
+    def get(self, smiles: str) -> Optional[str]:
+        with self._lock:
+            svg = self._svgs.get(smiles)
+            if svg is not None:
+                self._svgs.move_to_end(smiles)
+            return svg
+
+    def update(self, svgs: Dict[str, str]) -> None:
+        with self._lock:
+            for smiles, svg in svgs.items():
+                self._svgs[smiles] = svg
+                self._svgs.move_to_end(smiles)
+            while len(self._svgs) > self.maxsize:
+                self._svgs.popitem(last=False)
+
+
+@st.cache_resource
+def _prefetch_pool() -> ThreadPoolExecutor:
+    """
+    Background worker that draws neighbouring pages between reruns.
+    One thread: RDKit holds the GIL while drawing, so more would not help.
+    """
+    return ThreadPoolExecutor(max_workers=1)
+
+
+def render_structures(smiles: Sequence[str]) -> Dict[str, str]:
+    """
+    Map each distinct SMILES to its wrapped SVG.
+    Drawn in this thread: RDKit holds the GIL while drawing, so a thread pool
+    would only add hand-off overhead.
+    """
+    return {smi: mol_to_svg_str(smi) for smi in smiles}
+
+
+def _prefetch(
+    smiles: Sequence[str],
+    svg_map: _SvgStore,
+    disk_cache: diskcache.Cache,
+    stop: threading.Event,
+) -> None:
+    """
+    Draw SMILES into svg_map ahead of the pages that show them.
+    Returns early once stop is set, i.e. the user has paged elsewhere.
+    """
+    for smi in smiles:
+        if stop.is_set():
+            return
+        if smi not in svg_map:
+            svg_map.update({smi: _wrap_svg(_draw_svg(smi, disk_cache))})
+
+
+def _schedule_prefetch(smiles: Sequence[str], svg_map: _SvgStore) -> None:
+    """
+    Prefetch a page window's neighbours, with one job per session at a time.
+    A rerun over the same window keeps its job; a new window cancels or stops
+    the previous one, so the worker never queues up pages left behind.
+    """
+    # The store identifies the file; the SMILES identify the page window
+    window = (id(svg_map), tuple(smiles))
+    job = st.session_state.get("prefetch_job")
+    if job is not None:
+        previous, future, stop = job
+        if previous == window:
+            return
+        stop.set()
+        future.cancel()
+    stop = threading.Event()
+    future = _prefetch_pool().submit(
+        _prefetch, smiles, svg_map, _svg_disk_cache(), stop
+    )
+    st.session_state.prefetch_job = (window, future, stop)
+
+
+def _validate_query(query: str, columns: Sequence[str]) -> None:
+    """
+    Raise ValueError unless query is a plain expression over the given columns.
+    Backtick-quoted column names are swapped for placeholders before parsing.
+    """
+    parts = query.split("`")
+    if len(parts) % 2 == 0:
+        raise ValueError("Unbalanced backtick in query.")
+    allowed = {str(col) for col in columns}
+    for quoted in parts[1::2]:
+        if quoted not in allowed:
+            raise ValueError(f"Unknown column: {quoted}")
+    placeholders = {f"_quoted_{i}" for i in range(1, len(parts), 2)}
+    expr = "".join(
+        f"_quoted_{i}" if i % 2 else part for i, part in enumerate(parts)
+    )
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid query syntax: {e.msg}") from e
+    allowed |= placeholders
+    # ast.walk yields a call before its callee, so callees are known in time
+    callees = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _QUERY_NODES):
+            raise ValueError(f"Unsupported expression: {type(node).__name__}")
+        if isinstance(node, ast.Call):
+            func = node.func
+            if (
+                not isinstance(func, ast.Name)
+                or func.id not in _QUERY_FUNCS
+                or node.keywords
+            ):
+                raise ValueError(
+                    "Only math functions such as abs, sqrt and log can be called."
+                )
+            callees.add(id(func))
+        elif (
+            isinstance(node, ast.Name)
+            and id(node) not in callees
+            and node.id not in allowed
+        ):
+            raise ValueError(f"Unknown column: {node.id}")
+
+
+def _query_mask(df: pd.DataFrame, query: str) -> pd.Series:
+    """
+    Evaluate a validated filter query to a boolean row mask.
+    numexpr evaluates numeric columns in multithreaded chunks; expressions it
+    cannot handle, such as string comparisons, fall back to the Python engine.
+    """
+    try:
+        mask = df.eval(query, engine="numexpr")
+    except (ImportError, NotImplementedError, TypeError, ValueError):
+        mask = df.eval(query, engine="python")
+    if not pd.api.types.is_bool_dtype(mask):
+        raise ValueError("Query must be a condition, e.g. MW > 300.")
+    # Comparisons on Arrow string columns leave missing values as NA
+    return mask.fillna(False).astype(bool)
 
 
 def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
@@ -89,26 +339,45 @@ def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     query = st.sidebar.text_input("Filter Query (e.g. MW > 300 & LogP < 5):")
     try:
         if query:
-            df = df.query(query)
+            _validate_query(query, df.columns)
+            df = df[_query_mask(df, query)]
     except Exception as e:
         st.sidebar.error(f"Filter error: {e}")
     return df
 
 
-def prepare_dataframe(raw_df: pd.DataFrame) -> pd.DataFrame:
+def prepare_dataframe(
+    raw_df: pd.DataFrame, svg_map: _SvgStore, start_idx: int = 0
+) -> pd.DataFrame:
     """
     Add index and structure columns and reorder for display.
     Returns a new DataFrame with columns: Idx, Structure, <original columns>.
-    Only called on the current visible slice to save memory.
+    Only called on the current visible slice. Structures already in svg_map
+    are plain dict lookups; only the page's new SMILES are drawn, once each.
+    start_idx is the page's offset in the filtered table, so Idx shows global
+    row numbers.
     """
-    df = raw_df.copy()
-    df.insert(0, "Idx", range(1, len(df) + 1))
-    df.insert(
-        1,
-        "Structure",
-        df["SMILES"].apply(lambda smi: mol_to_svg_str(smi) if pd.notna(smi) else ""),
+    # Look up each distinct SMILES once, draw those not stored, then fan out to
+    # the rows; missing SMILES get code -1, which picks the trailing ""
+    codes, uniques = pd.factorize(raw_df["SMILES"])
+    stored = [svg_map.get(smi) for smi in uniques]
+    missing = [smi for smi, svg in zip(uniques, stored) if svg is None]
+    fresh = render_structures(missing)
+    svg_map.update(fresh)
+    svgs = np.array(
+        [fresh[smi] if svg is None else svg for smi, svg in zip(uniques, stored)]
+        + [""],
+        dtype=object,
     )
-    return df
+    structure = pd.Series(svgs[codes], index=raw_df.index, name="Structure")
+    idx = pd.Series(
+        np.arange(start_idx + 1, start_idx + len(raw_df) + 1, dtype=np.int32),
+        index=raw_df.index,
+        name="Idx",
+    )
+    # Prepend the new columns; copy-on-write (pandas 3) shares the page's
+    # columns, and an older pandas only copies this page-sized slice
+    return pd.concat([idx, structure, raw_df], axis=1)
 
 
 def get_svg_cellrenderer() -> JsCode:
@@ -125,16 +394,26 @@ def get_svg_cellrenderer() -> JsCode:
             getGui() {
                 return this.eGui;
             }
+            refresh(params) {
+                this.eGui.innerHTML = params.value;
+                return true;
+            }
+            destroy() {
+                this.eGui = null;
+            }
         }
     """
     )
 
 
-def build_aggrid_options(df: pd.DataFrame) -> dict:
+@st.cache_resource
+def build_aggrid_options(columns: tuple) -> dict:
     """
     Build AgGrid options with explicit header wrapping and column sizing.
+    Keyed on the column names only, so every page of a file reuses it.
+    The dict is shared, not copied, between runs: callers must not mutate it.
     """
-    gb = GridOptionsBuilder.from_dataframe(df)
+    gb = GridOptionsBuilder.from_dataframe(pd.DataFrame(columns=list(columns)))
 
     svg_cellrenderer = get_svg_cellrenderer()
 
@@ -150,6 +429,7 @@ def build_aggrid_options(df: pd.DataFrame) -> dict:
         headerClass="custom-header",
         wrapHeaderText=True,
         cellStyle={"textAlign": "right"},
+        type=["numericColumn", "numberColumnFilter"],
     )  # Right align content
 
     # Structure column - keep structure images centered for visual clarity
@@ -167,22 +447,22 @@ def build_aggrid_options(df: pd.DataFrame) -> dict:
     )  # Center align structure images
 
     # All other columns - force width and right align
-    for col in df.columns:
-        if col not in ["Idx", "Structure"]:
-            gb.configure_column(
-                col,
-                width=50,
-                minWidth=50,
-                maxWidth=200,  # Allow some expansion but start at 50
-                flex=0,  # Disable flex sizing
-                resizable=True,
-                headerClass="custom-header",
-                wrapHeaderText=True,
-                suppressSizeToFit=True,
-                suppressAutoSize=True,
-                cellStyle={"textAlign": "right"},  # Right align content
-                type="numericColumn",
-            )  # Use numeric type for consistent right alignment
+    other_cols = [col for col in columns if col not in {"Idx", "Structure"}]
+    for col in other_cols:
+        gb.configure_column(
+            col,
+            width=50,
+            minWidth=50,
+            maxWidth=200,  # Allow some expansion but start at 50
+            flex=0,  # Disable flex sizing
+            resizable=True,
+            headerClass="custom-header",
+            wrapHeaderText=True,
+            suppressSizeToFit=True,
+            suppressAutoSize=True,
+            cellStyle={"textAlign": "right"},  # Right align content
+            type="numericColumn",
+        )  # Use numeric type for consistent right alignment
 
     # Configure default column properties with right alignment
     gb.configure_default_column(
@@ -197,57 +477,24 @@ def build_aggrid_options(df: pd.DataFrame) -> dict:
     grid_options = gb.build()
 
     # Set row height and header height
-    grid_options["getRowHeight"] = JsCode("function(params) { return 100; }")
+    grid_options["rowHeight"] = 100
     grid_options["headerHeight"] = 80
+    # Few rows fit the viewport at this height, so keep the overscan small
+    grid_options["rowBuffer"] = 5
 
     # CRITICAL: These settings prevent all auto-sizing
-    grid_options["suppressColumnVirtualisation"] = True
     grid_options["suppressAutoSize"] = True
     grid_options["suppressSizeToFit"] = True
     grid_options["skipHeaderOnAutoSize"] = True
 
-    # Force column definitions to override any auto-sizing AND set right alignment
-    grid_options["onGridReady"] = JsCode(
-        """
-        function(params) {
-            // Force column widths and right alignment after grid is ready
-            const columnDefs = params.api.getColumnDefs();
-            columnDefs.forEach(function(colDef) {
-                if (colDef.field !== 'Idx' && colDef.field !== 'Structure') {
-                    colDef.width = 50;
-                    colDef.minWidth = 50;
-                    colDef.cellStyle = {'text-align': 'right'};
-                } else if (colDef.field === 'Idx') {
-                    colDef.cellStyle = {'text-align': 'right'};
-                } else if (colDef.field === 'Structure') {
-                    colDef.cellStyle = {'text-align': 'center'};
-                }
-                colDef.headerClass = 'custom-header';
-            });
-            params.api.setColumnDefs(columnDefs);
-            
-            // Apply right alignment to all existing cells (except structure)
-            const allCells = document.querySelectorAll('.ag-cell');
-            allCells.forEach(function(cell) {
-                const colId = cell.getAttribute('col-id');
-                if (colId === 'Structure') {
-                    cell.style.textAlign = 'center';
-                    cell.style.justifyContent = 'center';
-                } else {
-                    cell.style.textAlign = 'right';
-                    cell.style.justifyContent = 'flex-end';
-                }
-            });
-        }
-    """
-    )
-
     return grid_options
 
 
 def display_aggrid_table(df: pd.DataFrame, grid_options: dict) -> None:
     """
     Render the DataFrame in AgGrid, left-aligned with custom header styling.
+    The fixed key keeps one mounted grid across reruns; st_aggrid pushes new
+    rowData into it whenever the page's data hash changes.
     """
     st.markdown(
         "<div style='display: flex; justify-content: flex-start;'>",
@@ -261,34 +508,220 @@ def display_aggrid_table(df: pd.DataFrame, grid_options: dict) -> None:
         fit_columns_on_grid_load=False,  # CRITICAL: Keep this False
         reload_data=False,  # Change to False to prevent reloading
         theme="streamlit",
-        update_mode="MANUAL",  # Use MANUAL instead of MODEL_CHANGED
+        update_mode=GridUpdateMode.NO_UPDATE,  # Read-only: never sync state back
         columns_auto_size_mode=None,  # Disable auto-sizing completely
+        custom_css=AGGRID_CSS,
+        key="sdf-aggrid",
     )
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-@st.cache_data
+def _read_sdf(file_bytes: bytes) -> pd.DataFrame:
+    """
+    Parse SDF records into SMILES, ID and SD properties in one pass.
+    Properties stay text as written; numbers are converted
+    afterwards by _to_numeric, which leaves values such as "0012" alone.
+    Unparseable records are skipped and the index keeps record positions,
+    matching PandasTools.LoadSDF without holding a Mol object per row.
+    """
+    records = []
+    positions = []
+    for pos, mol in enumerate(Chem.ForwardSDMolSupplier(BytesIO(file_bytes))):
+        if mol is None:
+            continue
+        record = mol.GetPropsAsDict(autoConvertStrings=False)
+        if mol.HasProp("_Name"):
+            record["ID"] = mol.GetProp("_Name")
+        record["SMILES"] = Chem.MolToSmiles(mol)
+        records.append(record)
+        positions.append(pos)
+    return pd.DataFrame(records, index=positions)
+
+
+def _read_csv(file_bytes: bytes) -> pd.DataFrame:
+    """
+    Parse CSV with the multithreaded Arrow reader.
+    Columns stay NumPy-backed for query/AgGrid. Files the Arrow reader rejects,
+    such as ragged rows, are retried with the C parser.
+    """
+    try:
+        return pd.read_csv(BytesIO(file_bytes), engine="pyarrow")
+    except (ImportError, pd.errors.ParserError):
+        return pd.read_csv(BytesIO(file_bytes))
+
+
+# Readers by lower-case file extension, so new formats only need an entry here.
+_LOADERS = {".sdf": _read_sdf, ".csv": _read_csv}
+
+
+def _parses_losslessly(text: pd.Series, numbers: pd.Series) -> bool:
+    """
+    True if numbers still say what text says.
+    Rejects leading zeros ("0012" would become 12) and integers too long for
+    a float column to hold exactly.
+    """
+    valid = text.notna().to_numpy()
+    strings = text[valid].astype(str).str.strip()
+    if strings.str.contains(_LEADING_ZERO).any():
+        return False
+    if pd.api.types.is_float_dtype(numbers):
+        integers = numbers[valid][strings.str.contains(_INTEGER_TEXT).to_numpy()]
+        return bool((integers.abs() <= 2**53).all())
+    return True
+
+
+def _to_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert text columns whose every value is a plain number.
+    SD properties arrive as text; numeric dtypes let filters run vectorized.
+    Identifier columns, and columns a conversion would alter, stay text.
+    """
+    for col in df.select_dtypes(include=["object", "string"]).columns:
+        if col in _TEXT_COLUMNS:
+            continue
+        try:
+            numbers = pd.to_numeric(df[col])
+        except (TypeError, ValueError):
+            continue
+        if _parses_losslessly(df[col], numbers):
+            df[col] = numbers
+    return df
+
+
+def _downcast_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Narrow 64-bit numeric columns to 32 bits where every value survives.
+    Lossy casts are skipped so filters and displayed numbers never change.
+    """
+    int32 = np.iinfo(np.int32)
+    for col in df.select_dtypes("int64").columns:
+        if df[col].between(int32.min, int32.max).all():
+            df[col] = df[col].astype(np.int32)
+    for col in df.select_dtypes("float64").columns:
+        narrow = df[col].astype(np.float32)
+        if narrow.astype(np.float64).equals(df[col]):
+            df[col] = narrow
+    return df
+
+
+def _arrow_strings(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Store remaining text columns as Arrow-backed strings.
+    One buffer per column instead of a Python object per cell.
+    """
+    for col in df.select_dtypes(include=["object", "string"]).columns:
+        df[col] = df[col].astype("string[pyarrow]")
+    return df
+
+
+def _hash_bytes(data: bytes) -> int:
+    """Cache key for uploaded file contents; xxh3 is far cheaper than SHA-256."""
+    return xxhash.xxh3_64(data).intdigest()
+
+
+def _parse_cache_path(file_bytes: bytes, ext: str) -> str:
+    """Location of the Parquet copy of a parsed upload, keyed by its contents."""
+    digest = hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
+    name = f"{digest}{ext}.v{PARSE_CACHE_VERSION}.parquet"
+    return os.path.join(PARSE_CACHE_DIR, name)
+
+
+def _read_parse_cache(path: str) -> Optional[pd.DataFrame]:
+    """
+    Return the cached frame at path, or None if there is none.
+    A file that fails to load, e.g. one truncated by a full disk, is deleted
+    so the upload is parsed again and the cache rewritten.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+    except Exception:
+        with contextlib.suppress(OSError):
+            os.remove(path)
+        return None
+    with contextlib.suppress(OSError):
+        os.utime(path)  # Mark as recently used for _prune_parse_cache
+    return df
+
+
+def _write_parse_cache(df: pd.DataFrame, path: str) -> None:
+    """
+    Store a parsed frame as Parquet so later loads skip SDF/CSV parsing.
+    Frames Arrow cannot represent, such as mixed-type columns, are not cached.
+    """
+    try:
+        os.makedirs(PARSE_CACHE_DIR, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=PARSE_CACHE_DIR, suffix=".tmp")
+        os.close(fd)
+    except OSError:
+        return
+    try:
+        df.to_parquet(tmp, compression="zstd")
+        os.replace(tmp, path)  # Atomic, so readers never see a partial file
+    except (ImportError, NotImplementedError, OSError, TypeError, ValueError):
+        pass
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)  # Only still there if the write failed
+    _prune_parse_cache()
+
+
+def _prune_parse_cache() -> None:
+    """Delete least recently used Parquet files beyond PARSE_CACHE_MAX_BYTES."""
+    try:
+        entries = [
+            (entry.stat(), entry.path)
+            for entry in os.scandir(PARSE_CACHE_DIR)
+            if entry.name.endswith(".parquet")
+        ]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry[0].st_mtime, reverse=True)
+    total = 0
+    for stat, path in entries:
+        total += stat.st_size
+        if total > PARSE_CACHE_MAX_BYTES:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+
+@st.cache_resource(max_entries=4, hash_funcs={bytes: _hash_bytes})
+def _structure_store(file_bytes: bytes, file_name: str) -> _SvgStore:
+    """
+    SMILES-to-SVG store for one uploaded file, shared by reruns and sessions.
+    Keyed like load_data, so re-uploading a file reuses the structures drawn
+    for it; only the STRUCTURE_STORE_SIZE most recently used are kept.
+    """
+    return _SvgStore(STRUCTURE_STORE_SIZE)
+
+
+@st.cache_data(hash_funcs={bytes: _hash_bytes})
 def load_data(file_bytes: bytes, file_name: str) -> pd.DataFrame:
     """Load SDF or CSV data from the uploaded file bytes.
 
     The result is cached by Streamlit so repeated navigation does not reload the
     file from disk.
     """
-    file_type = file_name.split(".")[-1].lower()
+    ext = os.path.splitext(file_name)[1].lower()
+    try:
+        reader = _LOADERS[ext]
+    except KeyError:
+        raise ValueError("Unsupported file type.") from None
+    cache_path = _parse_cache_path(file_bytes, ext)
+    cached = _read_parse_cache(cache_path)
+    if cached is not None:
+        # pandas 2 reads Arrow strings back as string[python]
+        return _arrow_strings(cached)
     try:
-        if file_type == "sdf":
-            df = PandasTools.LoadSDF(
-                BytesIO(file_bytes), smilesName="SMILES", includeFingerprints=False
-            )
-        elif file_type == "csv":
-            df = pd.read_csv(BytesIO(file_bytes))
-        else:
-            raise ValueError("Unsupported file type.")
+        df = reader(file_bytes)
     except Exception as e:
         raise RuntimeError(f"Failed to load file: {e}") from e
 
     if "SMILES" not in df.columns:
         raise ValueError("No SMILES column found.")
+    df = _arrow_strings(_downcast_numeric(_to_numeric(df)))
+    _write_parse_cache(df, cache_path)
     return df
 
 
@@ -322,8 +755,9 @@ def main() -> None:
         return
 
     # Load & filter data
+    file_bytes = uploaded_file.getvalue()
     try:
-        raw_df = load_data(uploaded_file.getvalue(), uploaded_file.name)
+        raw_df = load_data(file_bytes, uploaded_file.name)
     except Exception as e:
         st.sidebar.error(str(e))
         return
@@ -345,11 +779,21 @@ def main() -> None:
     end = min(start + page_size - 1, n)
 
     # Only generate SVGs for visible window
-    df_page = df_filtered.iloc[start - 1 : end].copy()
-    df_page = prepare_dataframe(df_page)
+    svg_map = _structure_store(file_bytes, uploaded_file.name)
+    df_page = prepare_dataframe(df_filtered.iloc[start - 1 : end], svg_map, start - 1)
+
+    # Draw the previous and next pages in the background so paging hits svg_map
+    smiles = df_filtered["SMILES"]
+    previous = smiles.iloc[max(start - 1 - page_size, 0) : start - 1]
+    following = smiles.iloc[end : end + page_size]
+    neighbours = pd.unique(pd.concat([previous, following]).dropna())
+    _schedule_prefetch(neighbours, svg_map)
 
     st.subheader(f"Rows {start}–{end} of {n}")
-    grid_options = build_aggrid_options(df_page)
+    grid_options = build_aggrid_options(tuple(df_page.columns))
+    # Compact rows when nothing on this page could be drawn
+    if not (df_page["Structure"] != "").any():
+        grid_options = {**grid_options, "rowHeight": 30}
     display_aggrid_table(df_page, grid_options)
 
 
@@ -1,25 +1,118 @@
 """Streamlit application for viewing large SDF/CSV files.
 
 Enhanced navigation with pagination controls, search, and optimized memory usage.
-Only visible molecules are rendered and cached using LRU cache.
+Only visible molecules are rendered and cached in a bounded in-memory store.
 """
 
-from functools import lru_cache
+import ast
+import contextlib
+import hashlib
+import html
 from io import BytesIO
 import math
+import os
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
 
+import diskcache
+import numexpr
+import numpy as np
 import pandas as pd
 import streamlit as st
+import xxhash
 from rdkit import Chem
-from rdkit.Chem import PandasTools
 from rdkit.Chem.Draw import rdMolDraw2D
-from st_aggrid import AgGrid, GridOptionsBuilder
+from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 from st_aggrid.shared import JsCode
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 
+# Rendered SVGs persist here so restarts and other sessions skip RDKit drawing.
+SVG_CACHE_DIR = ".svg_cache"
+# Most recently used page structures kept in memory per cached file; they
+# are compressed, so more fit than in the other viewers.
+STRUCTURE_STORE_SIZE = 5000
+# Parsed uploads are kept here as Parquet, which reloads far faster than SDF.
+# Per user, and per app since each one post-processes the parsed frame
+# differently. Least recently used files go once the total passes the limit.
+PARSE_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "sdf-viewer",
+    "app003",
+)
+PARSE_CACHE_MAX_BYTES = 1 << 30
+# Bump whenever parsing or post-processing changes, so stale files are ignored.
+PARSE_CACHE_VERSION = 2
+# Identifiers that look numeric but must keep their text, e.g. "00003".
+_TEXT_COLUMNS = {"SMILES", "ID", "_Name"}
+# Number-like text pd.to_numeric may alter: leading zeros, and whole numbers
+# (exact in a float column only up to 2**53).
+_LEADING_ZERO = r"^[+-]?0\d"
+_INTEGER_TEXT = r"^[+-]?\d+$"
+# Syntax allowed in filter queries: comparisons, boolean logic and arithmetic.
+_QUERY_NODES = (
+    ast.Expression, ast.Load, ast.Name, ast.Constant, ast.List, ast.Tuple,
+    ast.Compare, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Call,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.And, ast.Or, ast.Not, ast.Invert, ast.BitAnd, ast.BitOr,
+    ast.UAdd, ast.USub, ast.Add, ast.Sub, ast.Mult, ast.Div,
+    ast.FloorDiv, ast.Mod, ast.Pow,
+)
+# Math functions pandas.eval can call in a query, e.g. abs(MW) > 5.
+_QUERY_FUNCS = frozenset({
+    "abs", "sqrt", "exp", "expm1", "log", "log10", "log1p", "floor", "ceil",
+    "sin", "cos", "tan", "sinh", "cosh", "tanh",
+    "arcsin", "arccos", "arctan", "arctan2", "arcsinh", "arccosh", "arctanh",
+})
+
+# Grid styles for header text wrapping and right alignment. AgGrid renders in
+# a component iframe, so these go in through AgGrid(custom_css=...); page-level
+# CSS never reaches the grid.
+AGGRID_CSS = {
+    ".ag-header-cell-text": {
+        "white-space": "normal !important",
+        "text-align": "right !important",
+        "justify-content": "flex-end !important",
+        "line-height": "1.2 !important",
+        "font-size": "14px !important",
+        "word-wrap": "break-word !important",
+        "overflow-wrap": "break-word !important",
+    },
+    ".ag-header-cell": {"padding": "4px !important"},
+    ".custom-header": {
+        "white-space": "normal !important",
+        "text-align": "right !important",
+        "justify-content": "flex-end !important",
+        "line-height": "1.2 !important",
+        "font-size": "14px",
+        "padding": "4px",
+        "word-wrap": "break-word !important",
+    },
+    # Right align all cell content, whatever the column type
+    ".ag-cell": {
+        "text-align": "right !important",
+        "justify-content": "flex-end !important",
+    },
+    ".ag-cell-value": {"text-align": "right !important"},
+    ".ag-cell-numeric": {"text-align": "right !important"},
+    ".ag-cell-wrapper": {"justify-content": "flex-end !important"},
+    ".ag-cell-text": {"text-align": "right !important"},
+    # Keep structure images centered
+    '.ag-cell[col-id="Structure"]': {
+        "text-align": "center !important",
+        "justify-content": "center !important",
+    },
+}
+
 
 def set_custom_aggrid_css() -> None:
-    """Inject custom CSS for AgGrid header text wrapping, right alignment, and shrink sidebar width."""
+    """
+    Inject page CSS for the sidebar, pagination controls and the HTML table.
+    The grid's own styles go in through AGGRID_CSS, since page CSS does not
+    reach the AgGrid iframe.
+    """
     st.markdown(
         """
     <style>
@@ -57,57 +150,268 @@ def set_custom_aggrid_css() -> None:
         background-color: #cccccc;
         cursor: not-allowed;
     }
-    /* AgGrid styling */
-    .ag-header-cell-text {
-        white-space: normal !important;
-        text-align: right !important;
-        justify-content: flex-end !important;
-        line-height: 1.2 !important;
-        font-size: 14px !important;
-        word-wrap: break-word !important;
-        overflow-wrap: break-word !important;
-    }
-    .ag-header-cell {
-        padding: 4px !important;
+    /* Static molecule table */
+    .mol-table-wrap {
+        max-height: 600px;
+        overflow: auto;
     }
-    .custom-header {
-        white-space: normal !important;
-        text-align: right !important;
-        justify-content: flex-end !important;
-        line-height: 1.2 !important;
+    .mol-table {
+        border-collapse: collapse;
         font-size: 14px;
-        padding: 4px;
-        word-wrap: break-word !important;
     }
-    .ag-cell { text-align: right !important; justify-content: flex-end !important; }
-    .ag-cell-value { text-align: right !important; }
-    .ag-cell-numeric { text-align: right !important; }
-    .ag-cell-wrapper { justify-content: flex-end !important; }
-    .ag-cell-text { text-align: right !important; }
+    .mol-table th {
+        position: sticky;
+        top: 0;
+        background-color: #f0f2f6;
+    }
+    .mol-table th, .mol-table td {
+        padding: 4px 8px;
+        border-bottom: 1px solid #e6e6e6;
+        text-align: right;
+        vertical-align: middle;
+    }
+    .mol-table td.structure { text-align: center; }
     </style>
     """,
         unsafe_allow_html=True,
     )
 
 
-@lru_cache(maxsize=500)
-def _cached_svg(smiles: str) -> str:
-    """Return an SVG string for the given SMILES structure."""
+@st.cache_resource
+def _svg_disk_cache() -> diskcache.Cache:
+    """On-disk SVG store shared with the other viewers."""
+    return diskcache.Cache(SVG_CACHE_DIR)
+
+
+def _draw_svg(smiles: str, disk_cache: diskcache.Cache) -> str:
+    """
+    Return an SVG string for the given SMILES structure.
+    Disk cache entries are keyed by canonical SMILES and canvas size; the
+    tuple keys keep these thumbnails apart from the other viewers' entries.
+    """
     mol = Chem.MolFromSmiles(smiles)
     if mol is None:
         return ""
-    drawer = rdMolDraw2D.MolDraw2DSVG(120, 100)
+    key = (Chem.MolToSmiles(mol), 120, 100)
+    svg = disk_cache.get(key)
+    if svg is None:
+        svg = _render_svg(mol)
+        disk_cache.set(key, svg)
+    return svg
+
+
+def _render_svg(mol: Chem.Mol) -> str:
+    """Draw a molecule as a 120x100 thumbnail SVG."""
+    # noFreetype: a drawer is single-use, so skip loading fonts for each one
+    drawer = rdMolDraw2D.MolDraw2DSVG(120, 100, -1, -1, True)
+    # Thumbnail settings: thin bonds and a fixed label size skip font scaling
+    opts = drawer.drawOptions()
+    opts.bondLineWidth = 1
+    opts.fixedFontSize = 10
     drawer.DrawMolecule(mol)
     drawer.FinishDrawing()
-    return drawer.GetDrawingText().replace("\n", "")
+    svg = drawer.GetDrawingText().replace("\n", "")
+    # Drop the XML prolog so the SVG can sit inline in HTML
+    return svg[svg.find("<svg"):]
+
+
+class _SvgMemo:
+    """
+    Bounded canonical-SMILES-to-SVG map shared by reruns, sessions and workers.
+    Equivalent SMILES share one entry. Lookups are plain dict reads; the lock
+    guards inserts, eviction of the oldest entries and the hit/miss counters.
+    """
+
+    def __init__(self, maxsize: int, disk_cache: diskcache.Cache) -> None:
+        self.maxsize = maxsize
+        self._disk_cache = disk_cache
+        self.hits = 0
+        self.misses = 0
+        self._canonical: Dict[str, str] = {}
+        self._svgs: Dict[str, str] = {}
+        self._lock = threading.Lock()
 
+    def __len__(self) -> int:
+        return len(self._svgs)
 
-def mol_to_svg_str(smiles: str) -> str:
-    """Wrap the cached SVG in a div so AgGrid can render it."""
-    svg = _cached_svg(smiles)
+    def get(self, smiles: str) -> str:
+        canonical = self._canonical.get(smiles)
+        if canonical is None:
+            mol = Chem.MolFromSmiles(smiles)
+            canonical = Chem.MolToSmiles(mol) if mol is not None else ""
+            with self._lock:
+                if len(self._canonical) >= 4 * self.maxsize:
+                    self._canonical.clear()
+                self._canonical[smiles] = canonical
+        svg = self._svgs.get(canonical)
+        if svg is not None:
+            with self._lock:
+                self.hits += 1
+            return svg
+        with self._lock:
+            self.misses += 1
+        svg = _draw_svg(canonical, self._disk_cache) if canonical else ""
+        with self._lock:
+            self._svgs[canonical] = svg
+            # Dicts keep insertion order, so the first key is the oldest
+            while len(self._svgs) > self.maxsize:
+                del self._svgs[next(iter(self._svgs))]
+        return svg
+
+
+@st.cache_resource(max_entries=4)
+def _svg_memo(maxsize: int) -> _SvgMemo:
+    """
+    The SVG memo for one cache size, shared by every session that picks it.
+    Keyed on the size so one session's setting never resizes another's memo.
+    """
+    return _SvgMemo(maxsize=maxsize, disk_cache=_svg_disk_cache())
+
+
+class _SvgStore:
+    """
+    SMILES-to-SVG map that keeps the maxsize most recently used entries.
+    Shared by reruns, sessions and worker threads, so access is locked.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._svgs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._svgs)
+
+    def __contains__(self, smiles: str) -> bool:
+        return smiles in self._svgs
+
+    def get(self, smiles: str) -> Optional[bytes]:
+        with self._lock:
+            svg = self._svgs.get(smiles)
+            if svg is not None:
+                self._svgs.move_to_end(smiles)
+            return svg
+
+    def update(self, svgs: Dict[str, bytes]) -> None:
+        with self._lock:
+            for smiles, svg in svgs.items():
+                self._svgs[smiles] = svg
+                self._svgs.move_to_end(smiles)
+            while len(self._svgs) > self.maxsize:
+                self._svgs.popitem(last=False)
+
+
+def _wrap_svg(svg: str) -> str:
+    """Wrap an SVG in a div so AgGrid can render it."""
     return f"<div>{svg}</div>" if svg else ""
 
 
+def _deflate_svg(svg: str) -> bytes:
+    """Compress a wrapped SVG for long-term storage; RDKit SVGs shrink ~3x."""
+    return zlib.compress(svg.encode(), 3)
+
+
+def _inflate_svg(data: bytes) -> str:
+    """Restore a wrapped SVG stored by _deflate_svg."""
+    return zlib.decompress(data).decode()
+
+
+def mol_to_svg_str(smiles: str, memo: _SvgMemo) -> str:
+    """Wrap the memoised SVG in a div so AgGrid can render it."""
+    return _wrap_svg(memo.get(smiles))
+
+
+def render_structures(smiles: Sequence[str], memo: _SvgMemo) -> Dict[str, str]:
+    """
+    Map each distinct SMILES to its wrapped SVG in one batch.
+    Duplicates are drawn once, in this thread: RDKit holds the GIL while
+    drawing, so a thread pool would only add hand-off overhead.
+    """
+    return {smi: mol_to_svg_str(smi, memo) for smi in dict.fromkeys(smiles)}
+
+
+def _validate_query(query: str, columns: Sequence[str]) -> None:
+    """
+    Raise ValueError unless query is a plain expression over the given columns.
+    Backtick-quoted column names are swapped for placeholders before parsing.
+    """
+    parts = query.split("`")
+    if len(parts) % 2 == 0:
+        raise ValueError("Unbalanced backtick in query.")
+    allowed = {str(col) for col in columns}
+    for quoted in parts[1::2]:
+        if quoted not in allowed:
+            raise ValueError(f"Unknown column: {quoted}")
+    placeholders = {f"_quoted_{i}" for i in range(1, len(parts), 2)}
+    expr = "".join(
+        f"_quoted_{i}" if i % 2 else part for i, part in enumerate(parts)
+    )
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid query syntax: {e.msg}") from e
+    allowed |= placeholders
+    # ast.walk yields a call before its callee, so callees are known in time
+    callees = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _QUERY_NODES):
+            raise ValueError(f"Unsupported expression: {type(node).__name__}")
+        if isinstance(node, ast.Call):
+            func = node.func
+            if (
+                not isinstance(func, ast.Name)
+                or func.id not in _QUERY_FUNCS
+                or node.keywords
+            ):
+                raise ValueError(
+                    "Only math functions such as abs, sqrt and log can be called."
+                )
+            callees.add(id(func))
+        elif (
+            isinstance(node, ast.Name)
+            and id(node) not in callees
+            and node.id not in allowed
+        ):
+            raise ValueError(f"Unknown column: {node.id}")
+
+
+def _query_mask(df: pd.DataFrame, query: str) -> pd.Series:
+    """
+    Evaluate a validated filter query to a boolean row mask.
+    numexpr evaluates numeric columns in multithreaded chunks; expressions it
+    cannot handle, such as string comparisons, fall back to the Python engine.
+    """
+    try:
+        mask = df.eval(query, engine="numexpr")
+    except (ImportError, NotImplementedError, TypeError, ValueError):
+        mask = df.eval(query, engine="python")
+    if not pd.api.types.is_bool_dtype(mask):
+        raise ValueError("Query must be a condition, e.g. MW > 300.")
+    # Comparisons on Arrow string columns leave missing values as NA
+    return mask.fillna(False).astype(bool)
+
+
+def _range_mask(df: pd.DataFrame, bounds: Dict[str, Sequence[float]]) -> np.ndarray:
+    """
+    Boolean mask of rows whose values fall inside every (min, max) range.
+    numexpr checks all columns in one multithreaded pass over the rows rather
+    than one NumPy pass per comparison; dtypes it rejects fall back to NumPy.
+    """
+    arrays = {f"c{i}": df[col].to_numpy() for i, col in enumerate(bounds)}
+    limits = {}
+    terms = []
+    for i, (low, high) in enumerate(bounds.values()):
+        limits[f"lo{i}"], limits[f"hi{i}"] = low, high
+        terms.append(f"(c{i} >= lo{i}) & (c{i} <= hi{i})")
+    try:
+        return numexpr.evaluate(" & ".join(terms), local_dict={**arrays, **limits})
+    except (NotImplementedError, TypeError, ValueError):
+        keep = np.ones(len(df), dtype=bool)
+        for values, (low, high) in zip(arrays.values(), bounds.values()):
+            keep &= (values >= low) & (values <= high)
+        return keep
+
+
 def search_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """
     Allow searching/filtering of DataFrame using multiple methods.
@@ -120,43 +424,49 @@ def search_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     
     # Column-based search
     numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+    filters = {}
     if numeric_cols:
         st.sidebar.write("**Numeric Filters:**")
-        filters = {}
         for col in numeric_cols[:5]:  # Limit to first 5 numeric columns
             col_min, col_max = float(df[col].min()), float(df[col].max())
             if col_min != col_max:  # Only show slider if there's a range
-                filters[col] = st.sidebar.slider(
+                value = st.sidebar.slider(
                     f"{col}",
                     min_value=col_min,
                     max_value=col_max,
                     value=(col_min, col_max),
                     key=f"filter_{col}"
                 )
+                # A slider left at its full range filters nothing
+                if value != (col_min, col_max):
+                    filters[col] = value
     
     # Advanced query
     with st.sidebar.expander("Advanced Query"):
         query = st.text_input("Pandas Query:", placeholder="e.g., MW > 300 & LogP < 5")
     
-    # Apply filters
-    filtered_df = df.copy()
+    # Every active filter contributes one boolean mask over df; they are
+    # combined and applied once, so df is never modified or copied per filter
+    filtered_df = df
     
     try:
+        masks = []
         # SMILES search
         if smiles_search:
-            mask = filtered_df['SMILES'].str.contains(smiles_search, case=False, na=False)
-            filtered_df = filtered_df[mask]
-        
-        # Numeric filters
-        if 'filters' in locals():
-            for col, (min_val, max_val) in filters.items():
-                filtered_df = filtered_df[
-                    (filtered_df[col] >= min_val) & (filtered_df[col] <= max_val)
-                ]
+            # Literal match: SMILES are full of regex metacharacters such as ( [ + =
+            masks.append(
+                df['SMILES'].str.contains(
+                    smiles_search, case=False, na=False, regex=False
+                ).to_numpy(dtype=bool)
+            )
         
-        # Advanced query
+        if filters:
+            masks.append(_range_mask(df, filters))
         if query:
-            filtered_df = filtered_df.query(query)
+            _validate_query(query, df.columns)
+            masks.append(_query_mask(df, query).to_numpy())
+        if masks:
+            filtered_df = df.iloc[np.flatnonzero(np.logical_and.reduce(masks))]
             
     except Exception as e:
         st.sidebar.error(f"Filter error: {e}")
@@ -167,20 +477,44 @@ def search_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     return filtered_df
 
 
-def prepare_dataframe(raw_df: pd.DataFrame, start_idx: int = 0) -> pd.DataFrame:
+def prepare_dataframe(
+    raw_df: pd.DataFrame,
+    svg_map: _SvgStore,
+    memo: _SvgMemo,
+    start_idx: int = 0,
+) -> pd.DataFrame:
     """
     Add index and structure columns and reorder for display.
     Returns a new DataFrame with columns: Idx, Structure, <original columns>.
+    Structures come from svg_map; any not drawn before are drawn now through
+    memo and added to it.
     start_idx allows showing global row numbers even in filtered/paginated views.
     """
-    df = raw_df.copy()
-    df.insert(0, "Idx", range(start_idx + 1, start_idx + len(df) + 1))
-    df.insert(
-        1,
-        "Structure",
-        df["SMILES"].apply(lambda smi: mol_to_svg_str(smi) if pd.notna(smi) else ""),
+    # Look up each distinct SMILES once, draw those not stored, then fan out to
+    # the rows; missing SMILES get code -1, which picks the trailing ""
+    codes, uniques = pd.factorize(raw_df["SMILES"])
+    stored = [svg_map.get(smi) for smi in uniques]
+    missing = [smi for smi, svg in zip(uniques, stored) if svg is None]
+    fresh = render_structures(missing, memo)
+    svg_map.update({smi: _deflate_svg(svg) for smi, svg in fresh.items()})
+    # svg_map holds compressed SVGs; only this page's are inflated
+    svgs = np.array(
+        [
+            fresh[smi] if svg is None else _inflate_svg(svg)
+            for smi, svg in zip(uniques, stored)
+        ]
+        + [""],
+        dtype=object,
     )
-    return df
+    structure = pd.Series(svgs[codes], index=raw_df.index, name="Structure")
+    idx = pd.Series(
+        np.arange(start_idx + 1, start_idx + len(raw_df) + 1, dtype=np.int32),
+        index=raw_df.index,
+        name="Idx",
+    )
+    # Prepend the new columns; copy-on-write (pandas 3) shares the page's
+    # columns, and an older pandas only copies this page-sized slice
+    return pd.concat([idx, structure, raw_df], axis=1)
 
 
 def get_svg_cellrenderer() -> JsCode:
@@ -195,14 +529,26 @@ def get_svg_cellrenderer() -> JsCode:
             getGui() {
                 return this.eGui;
             }
+            refresh(params) {
+                this.eGui.innerHTML = params.value;
+                return true;
+            }
+            destroy() {
+                this.eGui = null;
+            }
         }
     """
     )
 
 
-def build_aggrid_options(df: pd.DataFrame) -> dict:
-    """Build AgGrid options with explicit header wrapping and column sizing."""
-    gb = GridOptionsBuilder.from_dataframe(df)
+@st.cache_resource
+def build_aggrid_options(columns: tuple) -> dict:
+    """
+    Build AgGrid options with explicit header wrapping and column sizing.
+    Keyed on the column names only, so every page of a file reuses it.
+    The dict is shared, not copied, between runs: callers must not mutate it.
+    """
+    gb = GridOptionsBuilder.from_dataframe(pd.DataFrame(columns=list(columns)))
     svg_cellrenderer = get_svg_cellrenderer()
 
     # Index column
@@ -217,6 +563,7 @@ def build_aggrid_options(df: pd.DataFrame) -> dict:
         headerClass="custom-header",
         wrapHeaderText=True,
         cellStyle={"textAlign": "right"},
+        type=["numericColumn", "numberColumnFilter"],
     )
 
     # Structure column
@@ -234,22 +581,22 @@ def build_aggrid_options(df: pd.DataFrame) -> dict:
     )
 
     # All other columns
-    for col in df.columns:
-        if col not in ["Idx", "Structure"]:
-            gb.configure_column(
-                col,
-                width=50,
-                minWidth=50,
-                maxWidth=200,
-                flex=0,
-                resizable=True,
-                headerClass="custom-header",
-                wrapHeaderText=True,
-                suppressSizeToFit=True,
-                suppressAutoSize=True,
-                cellStyle={"textAlign": "right"},
-                type="numericColumn",
-            )
+    other_cols = [col for col in columns if col not in {"Idx", "Structure"}]
+    for col in other_cols:
+        gb.configure_column(
+            col,
+            width=50,
+            minWidth=50,
+            maxWidth=200,
+            flex=0,
+            resizable=True,
+            headerClass="custom-header",
+            wrapHeaderText=True,
+            suppressSizeToFit=True,
+            suppressAutoSize=True,
+            cellStyle={"textAlign": "right"},
+            type="numericColumn",
+        )
 
     gb.configure_default_column(
         wrapText=True,
@@ -260,46 +607,13 @@ def build_aggrid_options(df: pd.DataFrame) -> dict:
     )
 
     grid_options = gb.build()
-    grid_options["getRowHeight"] = JsCode("function(params) { return 100; }")
+    grid_options["rowHeight"] = 100
     grid_options["headerHeight"] = 80
-    grid_options["suppressColumnVirtualisation"] = True
+    grid_options["rowBuffer"] = 5
     grid_options["suppressAutoSize"] = True
     grid_options["suppressSizeToFit"] = True
     grid_options["skipHeaderOnAutoSize"] = True
 
-    grid_options["onGridReady"] = JsCode(
-        """
-        function(params) {
-            const columnDefs = params.api.getColumnDefs();
-            columnDefs.forEach(function(colDef) {
-                if (colDef.field !== 'Idx' && colDef.field !== 'Structure') {
-                    colDef.width = 50;
-                    colDef.minWidth = 50;
-                    colDef.cellStyle = {'text-align': 'right'};
-                } else if (colDef.field === 'Idx') {
-                    colDef.cellStyle = {'text-align': 'right'};
-                } else if (colDef.field === 'Structure') {
-                    colDef.cellStyle = {'text-align': 'center'};
-                }
-                colDef.headerClass = 'custom-header';
-            });
-            params.api.setColumnDefs(columnDefs);
-            
-            const allCells = document.querySelectorAll('.ag-cell');
-            allCells.forEach(function(cell) {
-                const colId = cell.getAttribute('col-id');
-                if (colId === 'Structure') {
-                    cell.style.textAlign = 'center';
-                    cell.style.justifyContent = 'center';
-                } else {
-                    cell.style.textAlign = 'right';
-                    cell.style.justifyContent = 'flex-end';
-                }
-            });
-        }
-    """
-    )
-
     return grid_options
 
 
@@ -352,6 +666,36 @@ def display_pagination_controls(current_page: int, total_pages: int, key_prefix:
     return new_page
 
 
+def _html_cell(value) -> str:
+    """Escape one table value for HTML, showing missing values as blank."""
+    return "" if pd.isna(value) else html.escape(str(value))
+
+
+def render_html_table(df: pd.DataFrame) -> None:
+    """
+    Render a prepared page as one static HTML table.
+    Read-only paging needs none of AgGrid's state sync or JS setup, so the page
+    ships as a single markdown element with structures inlined as SVG.
+    """
+    header = "".join(f"<th>{html.escape(str(col))}</th>" for col in df.columns)
+    rows = "".join(
+        "<tr>"
+        + "".join(
+            f'<td class="structure">{value}</td>'
+            if col == "Structure"
+            else f"<td>{_html_cell(value)}</td>"
+            for col, value in zip(df.columns, row)
+        )
+        + "</tr>"
+        for row in df.itertuples(index=False, name=None)
+    )
+    st.markdown(
+        f'<div class="mol-table-wrap"><table class="mol-table">'
+        f"<thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table></div>",
+        unsafe_allow_html=True,
+    )
+
+
 def display_aggrid_table(df: pd.DataFrame, grid_options: dict) -> None:
     """Render the DataFrame in AgGrid with custom styling."""
     st.markdown(
@@ -366,33 +710,223 @@ def display_aggrid_table(df: pd.DataFrame, grid_options: dict) -> None:
         fit_columns_on_grid_load=False,
         reload_data=False,
         theme="streamlit",
-        update_mode="MANUAL",
+        update_mode=GridUpdateMode.NO_UPDATE,  # Read-only: never sync state back
         columns_auto_size_mode=None,
+        custom_css=AGGRID_CSS,
     )
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-@st.cache_data
+def _read_sdf(file_bytes: bytes) -> pd.DataFrame:
+    """
+    Parse SDF records into SMILES, ID and SD properties in one pass.
+    Properties stay text as written; numbers are converted
+    afterwards by _to_numeric, which leaves values such as "0012" alone.
+    Unparseable records are skipped and the index keeps record positions,
+    matching PandasTools.LoadSDF without holding a Mol object per row.
+    """
+    records = []
+    positions = []
+    for pos, mol in enumerate(Chem.ForwardSDMolSupplier(BytesIO(file_bytes))):
+        if mol is None:
+            continue
+        record = mol.GetPropsAsDict(autoConvertStrings=False)
+        if mol.HasProp("_Name"):
+            record["ID"] = mol.GetProp("_Name")
+        record["SMILES"] = Chem.MolToSmiles(mol)
+        records.append(record)
+        positions.append(pos)
+    return pd.DataFrame(records, index=positions)
+
+
+def _read_csv(file_bytes: bytes) -> pd.DataFrame:
+    """Parse CSV with the default pandas reader."""
+    return pd.read_csv(BytesIO(file_bytes))
+
+
+# Readers by lower-case file extension, so new formats only need an entry here.
+_LOADERS = {".sdf": _read_sdf, ".csv": _read_csv}
+
+
+def _parses_losslessly(text: pd.Series, numbers: pd.Series) -> bool:
+    """
+    True if numbers still say what text says.
+    Rejects leading zeros ("0012" would become 12) and integers too long for
+    a float column to hold exactly.
+    """
+    valid = text.notna().to_numpy()
+    strings = text[valid].astype(str).str.strip()
+    if strings.str.contains(_LEADING_ZERO).any():
+        return False
+    if pd.api.types.is_float_dtype(numbers):
+        integers = numbers[valid][strings.str.contains(_INTEGER_TEXT).to_numpy()]
+        return bool((integers.abs() <= 2**53).all())
+    return True
+
+
+def _to_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert text columns whose every value is a plain number.
+    SD properties arrive as text; numeric dtypes let the sliders and queries run vectorized.
+    Identifier columns, and columns a conversion would alter, stay text.
+    """
+    for col in df.select_dtypes(include=["object", "string"]).columns:
+        if col in _TEXT_COLUMNS:
+            continue
+        try:
+            numbers = pd.to_numeric(df[col])
+        except (TypeError, ValueError):
+            continue
+        if _parses_losslessly(df[col], numbers):
+            df[col] = numbers
+    return df
+
+
+def _downcast_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Narrow 64-bit numeric columns to 32 bits where every value survives.
+    Lossy casts are skipped so filters and displayed numbers never change.
+    """
+    int32 = np.iinfo(np.int32)
+    for col in df.select_dtypes("int64").columns:
+        if df[col].between(int32.min, int32.max).all():
+            df[col] = df[col].astype(np.int32)
+    for col in df.select_dtypes("float64").columns:
+        narrow = df[col].astype(np.float32)
+        if narrow.astype(np.float64).equals(df[col]):
+            df[col] = narrow
+    return df
+
+
+def _arrow_strings(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Store remaining text columns as Arrow-backed strings.
+    One buffer per column instead of a Python object per cell.
+    """
+    for col in df.select_dtypes(include=["object", "string"]).columns:
+        df[col] = df[col].astype("string[pyarrow]")
+    return df
+
+
+def _hash_bytes(data: bytes) -> int:
+    """Cache key for uploaded file contents; xxh3 is far cheaper than SHA-256."""
+    return xxhash.xxh3_64(data).intdigest()
+
+
+def _parse_cache_path(file_bytes: bytes, ext: str) -> str:
+    """Location of the Parquet copy of a parsed upload, keyed by its contents."""
+    digest = hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
+    name = f"{digest}{ext}.v{PARSE_CACHE_VERSION}.parquet"
+    return os.path.join(PARSE_CACHE_DIR, name)
+
+
+def _read_parse_cache(path: str) -> Optional[pd.DataFrame]:
+    """
+    Return the cached frame at path, or None if there is none.
+    A file that fails to load, e.g. one truncated by a full disk, is deleted
+    so the upload is parsed again and the cache rewritten.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+    except Exception:
+        with contextlib.suppress(OSError):
+            os.remove(path)
+        return None
+    with contextlib.suppress(OSError):
+        os.utime(path)  # Mark as recently used for _prune_parse_cache
+    return df
+
+
+def _write_parse_cache(df: pd.DataFrame, path: str) -> None:
+    """
+    Store a parsed frame as Parquet so later loads skip SDF/CSV parsing.
+    Frames Arrow cannot represent, such as mixed-type columns, are not cached.
+    """
+    try:
+        os.makedirs(PARSE_CACHE_DIR, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=PARSE_CACHE_DIR, suffix=".tmp")
+        os.close(fd)
+    except OSError:
+        return
+    try:
+        df.to_parquet(tmp, compression="zstd")
+        os.replace(tmp, path)  # Atomic, so readers never see a partial file
+    except (ImportError, NotImplementedError, OSError, TypeError, ValueError):
+        pass
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)  # Only still there if the write failed
+    _prune_parse_cache()
+
+
+def _prune_parse_cache() -> None:
+    """Delete least recently used Parquet files beyond PARSE_CACHE_MAX_BYTES."""
+    try:
+        entries = [
+            (entry.stat(), entry.path)
+            for entry in os.scandir(PARSE_CACHE_DIR)
+            if entry.name.endswith(".parquet")
+        ]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry[0].st_mtime, reverse=True)
+    total = 0
+    for stat, path in entries:
+        total += stat.st_size
+        if total > PARSE_CACHE_MAX_BYTES:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+
+@st.cache_resource(max_entries=4, hash_funcs={bytes: _hash_bytes})
 def load_data(file_bytes: bytes, file_name: str) -> pd.DataFrame:
-    """Load SDF or CSV data from the uploaded file bytes."""
-    file_type = file_name.split(".")[-1].lower()
+    """
+    Load SDF or CSV data from the uploaded file bytes.
+    The frame is shared by reruns and sessions rather than unpickled afresh
+    each rerun, so callers must treat it as read-only; session state only
+    holds the page number.
+    """
+    ext = os.path.splitext(file_name)[1].lower()
     try:
-        if file_type == "sdf":
-            df = PandasTools.LoadSDF(
-                BytesIO(file_bytes), smilesName="SMILES", includeFingerprints=False
-            )
-        elif file_type == "csv":
-            df = pd.read_csv(BytesIO(file_bytes))
-        else:
-            raise ValueError("Unsupported file type.")
+        reader = _LOADERS[ext]
+    except KeyError:
+        raise ValueError("Unsupported file type.") from None
+    cache_path = _parse_cache_path(file_bytes, ext)
+    cached = _read_parse_cache(cache_path)
+    if cached is not None:
+        # pandas 2 reads Arrow strings back as string[python]
+        return _arrow_strings(cached)
+    try:
+        df = reader(file_bytes)
     except Exception as e:
         raise RuntimeError(f"Failed to load file: {e}") from e
 
     if "SMILES" not in df.columns:
         raise ValueError("No SMILES column found.")
+    df = _arrow_strings(_downcast_numeric(_to_numeric(df)))
+    _write_parse_cache(df, cache_path)
     return df
 
 
+@st.cache_resource(max_entries=4, hash_funcs={bytes: _hash_bytes})
+def _structure_store(file_bytes: bytes, file_name: str) -> _SvgStore:
+    """
+    SMILES-to-SVG store for one uploaded file, shared by reruns and sessions.
+    Pages add their structures as they are shown, so revisiting a page reads
+    finished drawings; only the STRUCTURE_STORE_SIZE most recently used are
+    kept. SVGs are stored zlib-compressed to fit more of them.
+    """
+    return _SvgStore(STRUCTURE_STORE_SIZE)
+
+
+@st.cache_resource(max_entries=4, hash_funcs={bytes: _hash_bytes})
+def _distinct_smiles(file_bytes: bytes, file_name: str) -> int:
+    """Number of distinct SMILES in an uploaded file, counted once per file."""
+    return load_data(file_bytes, file_name)["SMILES"].nunique()
+
+
 def setup_page() -> None:
     """Configure the Streamlit page and apply custom styling."""
     st.set_page_config(layout="wide", page_title="Molecule Viewer", page_icon="🧪")
@@ -421,6 +955,11 @@ def main() -> None:
         options=page_size_options,
         index=1  # Default to 20
     )
+    interactive = st.sidebar.checkbox(
+        "Interactive grid",
+        value=False,
+        help="Use AgGrid for resizable columns; the plain table pages faster",
+    )
     
     # Performance settings
     with st.sidebar.expander("⚙️ Performance Settings"):
@@ -431,8 +970,7 @@ def main() -> None:
             value=500,
             help="Number of molecule structures to keep in memory"
         )
-        # Update cache size (this would require restarting the app to take effect)
-        st.info("Cache size changes require app restart")
+        memo = _svg_memo(cache_size)
     
     st.sidebar.markdown("---")
     
@@ -442,8 +980,9 @@ def main() -> None:
         return
 
     # Load & filter data
+    file_bytes = uploaded_file.getvalue()
     try:
-        raw_df = load_data(uploaded_file.getvalue(), uploaded_file.name)
+        raw_df = load_data(file_bytes, uploaded_file.name)
         st.sidebar.success(f"✅ Loaded {len(raw_df):,} molecules")
     except Exception as e:
         st.sidebar.error(f"❌ {str(e)}")
@@ -488,12 +1027,20 @@ def main() -> None:
     )
     
     # Get the current page of data
-    df_page = df_filtered.iloc[start_idx:end_idx].copy()
-    df_page = prepare_dataframe(df_page, start_idx)
+    svg_map = _structure_store(file_bytes, uploaded_file.name)
+    df_page = prepare_dataframe(
+        df_filtered.iloc[start_idx:end_idx], svg_map, memo, start_idx
+    )
     
     # Display the table
-    grid_options = build_aggrid_options(df_page)
-    display_aggrid_table(df_page, grid_options)
+    if interactive:
+        grid_options = build_aggrid_options(tuple(df_page.columns))
+        # Compact rows when nothing on this page could be drawn
+        if not (df_page["Structure"] != "").any():
+            grid_options = {**grid_options, "rowHeight": 30}
+        display_aggrid_table(df_page, grid_options)
+    else:
+        render_html_table(df_page)
     
     # Display pagination controls at the bottom
     st.markdown("---")
@@ -509,10 +1056,13 @@ def main() -> None:
     
     # Display cache info
     with st.expander("📊 Performance Info"):
-        cache_info = _cached_svg.cache_info()
-        st.write(f"**SVG Cache:** {cache_info.currsize}/{cache_info.maxsize} cached, "
-                f"{cache_info.hits} hits, {cache_info.misses} misses")
-        st.write(f"**Cache hit rate:** {cache_info.hits/(cache_info.hits + cache_info.misses)*100:.1f}%")
+        st.write(f"**SVG Cache:** {len(memo)}/{memo.maxsize} cached, "
+                f"{memo.hits} hits, {memo.misses} misses")
+        lookups = memo.hits + memo.misses
+        if lookups:
+            st.write(f"**Cache hit rate:** {memo.hits/lookups*100:.1f}%")
+        st.write(f"**Structures in memory:** {len(svg_map):,} of "
+                f"{_distinct_smiles(file_bytes, uploaded_file.name):,} in file")
 
 
 if __name__ == "__main__":